@@ -0,0 +1,203 @@
+import os
+import sys
+import sqlite3
+import logging
+import argparse
+from metadata_processor import MetadataProcessor, DependencyError
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".msuk_caption_index.db")
+
+INCLUDED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')
+
+# Caption keys (lowercased) that feed each searchable field
+FIELD_KEYS = {
+    "car": ("car", "car no", "car number", "no", "number"),
+    "driver": ("driver", "co-driver", "codriver", "navigator"),
+    "stage": ("stage", "ss", "stage name"),
+}
+
+# Bump when the schema changes; the index is a cache, so old ones are rebuilt
+SCHEMA_VERSION = 2
+
+# Files indexed per transaction
+COMMIT_EVERY = 500
+
+
+class CaptionIndex:
+    def __init__(self, db_path=DEFAULT_DB_PATH, processor=None):
+        self.logger = logging.getLogger(__name__)
+        self._processor = processor
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS captions;
+            """)
+
+        # captions rows share their rowid with files.id, so updates never scan the FTS table
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS captions USING fts5(
+                caption, car, driver, stage
+            );
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+
+    @property
+    def processor(self):
+        # Only indexing reads images, so searching never needs exempi
+        if self._processor is None:
+            self._processor = MetadataProcessor()
+        return self._processor
+
+    def close(self):
+        self.conn.close()
+
+    def extract_fields(self, description):
+        """Map caption key/value pairs onto the car, driver and stage columns"""
+        fields = {name: [] for name in FIELD_KEYS}
+        for key, value in self.processor.parse_description(description):
+            for name, keys in FIELD_KEYS.items():
+                if key.lower() in keys:
+                    fields[name].append(value)
+        return {name: ' '.join(values) for name, values in fields.items()}
+
+    def _walk(self, folder, skip_dirs):
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if d not in skip_dirs]
+            for filename in files:
+                if filename.lower().endswith(INCLUDED_EXTENSIONS):
+                    yield os.path.join(root, filename)
+
+    def refresh(self, folders, skip_dirs=("MSUK",), progress=None):
+        """
+        Walk each folder once and (re)index files whose size or mtime changed.
+        Files that have disappeared from the folders are dropped from the index.
+        Returns a (indexed, unchanged, removed) tuple of counts.
+        """
+        known = {
+            path: (file_id, size, mtime)
+            for file_id, path, size, mtime in self.conn.execute("SELECT id, path, size, mtime FROM files")
+        }
+        seen = set()
+        indexed = unchanged = 0
+
+        for folder in folders:
+            for path in self._walk(os.path.abspath(folder), skip_dirs):
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                file_id, size, mtime = known.get(path, (None, None, None))
+                if (size, mtime) == (stat.st_size, stat.st_mtime):
+                    unchanged += 1
+                    continue
+
+                try:
+                    description = self.processor.read_description(path)
+                except DependencyError:
+                    raise
+                except Exception as e:
+                    # Leave the file unrecorded so the next refresh tries it again
+                    self.logger.error(f"Error reading {os.path.basename(path)}: {str(e)}")
+                    continue
+
+                fields = self.extract_fields(description)
+                if file_id is None:
+                    file_id = self.conn.execute(
+                        "INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)",
+                        (path, stat.st_size, stat.st_mtime)
+                    ).lastrowid
+                else:
+                    self.conn.execute("DELETE FROM captions WHERE rowid = ?", (file_id,))
+                    self.conn.execute(
+                        "UPDATE files SET size = ?, mtime = ? WHERE id = ?",
+                        (stat.st_size, stat.st_mtime, file_id)
+                    )
+                self.conn.execute(
+                    "INSERT INTO captions (rowid, caption, car, driver, stage) VALUES (?, ?, ?, ?, ?)",
+                    (file_id, description, fields["car"], fields["driver"], fields["stage"])
+                )
+                indexed += 1
+                if indexed % COMMIT_EVERY == 0:
+                    self.conn.commit()
+
+                if progress:
+                    progress(path)
+
+        roots = [os.path.join(os.path.abspath(folder), '') for folder in folders]
+        removed = [
+            (file_id,) for path, (file_id, size, mtime) in known.items()
+            if path not in seen and any(path.startswith(root) for root in roots)
+        ]
+        self.conn.executemany("DELETE FROM captions WHERE rowid = ?", removed)
+        self.conn.executemany("DELETE FROM files WHERE id = ?", removed)
+        self.conn.commit()
+
+        return indexed, unchanged, len(removed)
+
+    def search(self, text=None, car=None, driver=None, stage=None, limit=500):
+        """Return (path, caption) rows matching every given term"""
+        terms = []
+        for column, value in (("car", car), ("driver", driver), ("stage", stage), ("caption", text)):
+            if not value:
+                continue
+            for word in str(value).split():
+                quoted = '"' + word.replace('"', '""') + '"'
+                terms.append(f"{column} : {quoted}")
+
+        if not terms:
+            return []
+
+        return self.conn.execute(
+            "SELECT files.path, captions.caption FROM captions JOIN files ON files.id = captions.rowid"
+            " WHERE captions MATCH ? ORDER BY files.path LIMIT ?",
+            (' AND '.join(terms), limit)
+        ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and search captions across the image archive.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Index database path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Index (or refresh) archive folders")
+    index_parser.add_argument("folders", nargs="+")
+
+    search_parser = subparsers.add_parser("search", help="Search indexed captions")
+    search_parser.add_argument("text", nargs="*", help="Free text to match anywhere in the caption")
+    search_parser.add_argument("--car", help="Car number")
+    search_parser.add_argument("--driver", help="Driver or co-driver name")
+    search_parser.add_argument("--stage", help="Stage name or number")
+
+    args = parser.parse_args(argv)
+
+    index = CaptionIndex(args.db)
+    try:
+        if args.command == "index":
+            try:
+                indexed, unchanged, removed = index.refresh(args.folders)
+            except DependencyError as e:
+                print(f"Error: {str(e)}")
+                sys.exit(1)
+            print(f"Indexed {indexed} images ({unchanged} unchanged, {removed} removed).")
+        else:
+            rows = index.search(' '.join(args.text), car=args.car, driver=args.driver, stage=args.stage)
+            for path, caption in rows:
+                print(f"{path}\n    {caption}")
+            print(f"{len(rows)} matches.")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
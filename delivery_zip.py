@@ -0,0 +1,133 @@
+import os
+import time
+import queue
+import zipfile
+import threading
+
+DEFAULT_MAX_BYTES = 2000 * 1024 * 1024
+
+# Already-compressed formats gain nothing from deflate, so they are stored as-is
+STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Local file header + central directory entry, excluding the filename
+ZIP_ENTRY_OVERHEAD = 30 + 46
+# End of central directory record
+ZIP_END_OVERHEAD = 22
+# Archives that can pass 4 GB also need zip64 extras per entry (local + central)
+# and the zip64 end of central directory record and locator
+ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+ZIP64_ENTRY_OVERHEAD = 20 + 28
+ZIP64_END_OVERHEAD = 56 + 20
+
+
+class DeliveryZipWriter:
+    """
+    Write processed images straight into one or more size-capped ZIP archives,
+    named <base_name>-001.zip, <base_name>-002.zip, ... inside output_folder.
+    No archive exceeds max_bytes unless a single file is larger than the cap
+    on its own.
+    """
+
+    def __init__(self, output_folder, base_name="MSUK", max_bytes=DEFAULT_MAX_BYTES, on_archive_closed=None):
+        self.output_folder = output_folder
+        self.base_name = base_name
+        self.max_bytes = max_bytes
+        self.on_archive_closed = on_archive_closed
+        self.archives = []
+        self.zip = None
+        self.current_size = 0
+        self.current_entries = 0
+
+    def _open_next(self):
+        self._close_current()
+        path = os.path.join(self.output_folder, f"{self.base_name}-{len(self.archives) + 1:03d}.zip")
+        self.zip = zipfile.ZipFile(path, 'w', allowZip64=True)
+        self.archives.append(path)
+        self.current_size = ZIP_END_OVERHEAD
+        if self.max_bytes >= ZIP64_LIMIT:
+            self.current_size += ZIP64_END_OVERHEAD
+        self.current_entries = 0
+
+    def _close_current(self):
+        if self.zip is not None:
+            self.zip.close()
+            self.zip = None
+            if self.on_archive_closed:
+                self.on_archive_closed(self.archives[-1])
+
+    def add(self, filename, data, mtime=None):
+        """Add a file, stamped with mtime (the source file's) so capture times survive delivery"""
+        if filename.lower().endswith(STORED_EXTENSIONS):
+            compress_type = zipfile.ZIP_STORED
+            data_size = len(data)
+        else:
+            compress_type = zipfile.ZIP_DEFLATED
+            # zlib's deflateBound, as incompressible data can grow slightly
+            data_size = len(data) + (len(data) >> 12) + (len(data) >> 14) + (len(data) >> 25) + 13
+
+        entry_size = data_size + ZIP_ENTRY_OVERHEAD + 2 * len(filename.encode('utf-8'))
+        if self.max_bytes >= ZIP64_LIMIT:
+            entry_size += ZIP64_ENTRY_OVERHEAD
+
+        if self.zip is None or (
+            self.current_entries and self.current_size + entry_size > self.max_bytes
+        ):
+            self._open_next()
+
+        # ZIP timestamps cannot predate 1980
+        date_time = time.localtime(time.time() if mtime is None else mtime)[:6]
+        info = zipfile.ZipInfo(filename, date_time=max(date_time, (1980, 1, 1, 0, 0, 0)))
+        info.compress_type = compress_type
+        info.external_attr = 0o644 << 16
+
+        self.zip.writestr(info, data)
+        self.current_size += entry_size
+        self.current_entries += 1
+
+    def close(self):
+        self._close_current()
+        return self.archives
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BackgroundZipWriter(DeliveryZipWriter):
+    """DeliveryZipWriter that writes on its own thread, so add() never blocks the caller on disk"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    DeliveryZipWriter.add(self, *item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.pending.task_done()
+
+    def add(self, filename, data, mtime=None):
+        self.pending.put((filename, data, mtime))
+
+    def busy(self):
+        return self.pending.unfinished_tasks > 0
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        archives = super().close()
+        if self.error is not None:
+            raise self.error
+        return archives
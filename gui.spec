@@ -6,7 +6,7 @@ a = Analysis(
     pathex=['/usr/local/lib', '/opt/homebrew/lib'],
     binaries=[],
     datas=[('assets/*', 'assets')],
-    hiddenimports=['libxmp'],
+    hiddenimports=['libxmp', 'paramiko'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=['runtime_hooks/init_libxmp.py'],
@@ -0,0 +1,174 @@
+import os
+import struct
+import itertools
+import multiprocessing
+from PIL import Image
+from metadata_processor import MetadataProcessor
+
+CHUNK_SIZE = 1024 * 1024
+
+# JPEG segments that only carry metadata (APPn and COM). APP2 (ICC profile) and
+# APP14 (Adobe colour transform) change how pixels decode, so they are compared.
+JPEG_METADATA_MARKERS = (set(range(0xE0, 0xF0)) - {0xE2, 0xEE}) | {0xFE}
+# JPEG markers with no length field
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xD9)) | {0x01}
+JPEG_SOS = 0xDA
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def jpeg_pixel_ranges(f):
+    """
+    Return (offset, length) ranges covering every JPEG segment except metadata APPn/COM.
+    Everything from the first SOS marker onwards is scan data and is kept whole.
+    """
+    if f.read(2) != b'\xff\xd8':
+        raise UnsupportedFormat("Not a JPEG file")
+
+    size = os.fstat(f.fileno()).st_size
+    ranges = []
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return ranges
+        if byte != b'\xff':
+            raise ValueError(f"Corrupt JPEG marker at offset {f.tell() - 1}")
+
+        # Skip fill bytes
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return ranges
+
+        start = f.tell() - 2
+        code = marker[0]
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+        if code == JPEG_SOS:
+            ranges.append((start, size - start))
+            return ranges
+
+        (length,) = struct.unpack('>H', f.read(2))
+        if code not in JPEG_METADATA_MARKERS:
+            ranges.append((start, length + 2))
+        f.seek(start + 2 + length)
+
+
+def png_pixel_ranges(f):
+    """Return (offset, length) ranges covering the type and data of every non-text PNG chunk"""
+    if f.read(8) != PNG_SIGNATURE:
+        raise UnsupportedFormat("Not a PNG file")
+
+    ranges = []
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return ranges
+        length, chunk_type = struct.unpack('>I4s', header)
+        start = f.tell() - 4
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            ranges.append((start, length + 4))
+        f.seek(start + 4 + length + 4)
+
+
+def pixel_ranges(f, path):
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        return jpeg_pixel_ranges(f)
+    if path.lower().endswith('.png'):
+        return png_pixel_ranges(f)
+    raise UnsupportedFormat(f"No byte-range reader for {os.path.basename(path)}")
+
+
+def read_ranges(f, ranges):
+    """Yield the ranges back to back in CHUNK_SIZE pieces, so equal-length streams line up chunk for chunk"""
+    buffer = bytearray()
+    for offset, length in ranges:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE - len(buffer), length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            buffer += chunk
+            if len(buffer) == CHUNK_SIZE:
+                yield buffer
+                buffer = bytearray()
+    if buffer:
+        yield buffer
+
+
+def pixel_data_matches(input_path, output_path):
+    """
+    Stream both files side by side, comparing only the non-metadata byte ranges
+    and stopping at the first difference.
+    Formats without a byte-range reader fall back to decoding with PIL.
+    """
+    try:
+        with open(input_path, 'rb') as src, open(output_path, 'rb') as dst:
+            src_ranges = pixel_ranges(src, input_path)
+            dst_ranges = pixel_ranges(dst, output_path)
+
+            if sum(length for _, length in src_ranges) != sum(length for _, length in dst_ranges):
+                return False
+
+            for src_chunk, dst_chunk in itertools.zip_longest(
+                read_ranges(src, src_ranges), read_ranges(dst, dst_ranges)
+            ):
+                if src_chunk != dst_chunk:
+                    return False
+
+            return True
+
+    except UnsupportedFormat:
+        with Image.open(input_path) as src, Image.open(output_path) as dst:
+            return src.size == dst.size and src.mode == dst.mode and src.tobytes() == dst.tobytes()
+
+
+def verify_image(processor, input_path, output_path):
+    """Check the output differs from the input only in metadata and carries the converted caption"""
+    try:
+        if not os.path.exists(output_path):
+            return False, "Output file missing"
+
+        if not pixel_data_matches(input_path, output_path):
+            return False, "Image data differs from input"
+
+        expected = processor.convert_description(processor.read_description(input_path))
+        if processor.read_description(output_path) != expected:
+            return False, "Caption was not written"
+
+        return True, "Verified"
+
+    except Exception as e:
+        return False, str(e)
+
+
+_processor = None
+
+
+def init_worker():
+    global _processor
+    _processor = MetadataProcessor()
+
+
+def verify_file(args):
+    input_folder, output_folder, filename = args
+    success, message = verify_image(
+        _processor,
+        os.path.join(input_folder, filename),
+        os.path.join(output_folder, filename)
+    )
+    return filename, success, message
+
+
+def verify_folder(input_folder, output_folder, files, num_workers=None):
+    """Verify every file in a worker pool, returning (filename, success, message) tuples"""
+    tasks = [(input_folder, output_folder, filename) for filename in files]
+    with multiprocessing.Pool(num_workers, initializer=init_worker) as pool:
+        return pool.map(verify_file, tasks)
@@ -1,7 +1,11 @@
 import os
+import struct
 import logging
+import tempfile
 import ctypes.util
-from iptcinfo3 import IPTCInfo
+from iptcinfo3 import IPTCInfo, jpeg_collect_file_parts
+
+XMP_APP1_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
 
 class DependencyError(Exception):
     """Custom exception for missing dependencies"""
@@ -43,19 +47,39 @@ class MetadataProcessor:
             raise DependencyError(f"Failed to initialize XMP: {str(e)}\nDYLD_LIBRARY_PATH={os.environ.get('DYLD_LIBRARY_PATH', 'not set')}")
 
 
-    def convert_description(self, input_desc):
+    def parse_description(self, input_desc):
+        """Split a Spacesuit description into (key, value) pairs"""
         parts = input_desc.strip('|').split('|')
-        cleaned_parts = []
-        
+        fields = []
+
         for part in parts:
             if not part.strip():
                 continue
             if ':' in part:
                 key, value = part.split(':', 1)
-                value = value.strip()
-                cleaned_parts.append(value)
-                
-        return ', '.join(cleaned_parts)
+                fields.append((key.strip(), value.strip()))
+
+        return fields
+
+    def convert_description(self, input_desc):
+        return ', '.join(value for key, value in self.parse_description(input_desc))
+
+    def read_description(self, input_path):
+        """Read the caption from IPTC, falling back to XMP dc:description"""
+        info = IPTCInfo(input_path)
+        caption = info['caption/abstract']
+        if caption:
+            return caption.decode('utf-8', errors='replace')
+
+        xmpfile = self.XMPFiles(file_path=input_path)
+        try:
+            xmp = xmpfile.get_xmp()
+            if xmp is not None and xmp.does_property_exist(self.xmp_consts.XMP_NS_DC, 'description[1]'):
+                return xmp.get_property(self.xmp_consts.XMP_NS_DC, 'description[1]')
+        finally:
+            xmpfile.close_file()
+
+        return ''
 
     def process_image(self, input_path, output_path):
         try:
@@ -90,4 +114,94 @@ class MetadataProcessor:
 
         except Exception as e:
             self.logger.error(f"Error processing {os.path.basename(input_path)}: {str(e)}")
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+
+    def _splice_xmp(self, data, description):
+        """
+        Set dc:description in a JPEG's XMP APP1 segment without touching disk.
+        Returns None if the packet would not fit in a single segment.
+        """
+        pos = 2
+        insert_at = None
+        existing = None
+        while pos + 4 <= len(data) and data[pos] == 0xFF:
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker == 0xDA:
+                break
+
+            (length,) = struct.unpack('>H', data[pos + 2:pos + 4])
+            payload = data[pos + 4:pos + 2 + length]
+            if marker == 0xE1 and payload.startswith(XMP_APP1_HEADER):
+                existing = (pos, pos + 2 + length, payload[len(XMP_APP1_HEADER):])
+                break
+            # New XMP goes after the leading JFIF/EXIF segments
+            if insert_at is None and marker not in (0xE0, 0xE1):
+                insert_at = pos
+            pos += 2 + length
+
+        if existing:
+            start, end, packet = existing
+            xmp = self.XMPMeta(xmp_str=packet.decode('utf-8', errors='replace'))
+        else:
+            start = end = pos if insert_at is None else insert_at
+            xmp = self.XMPMeta()
+
+        xmp.set_property(self.xmp_consts.XMP_NS_DC, 'description[1]', description)
+        packet = xmp.serialize_to_str()
+        if isinstance(packet, str):
+            packet = packet.encode('utf-8')
+
+        segment = XMP_APP1_HEADER + packet
+        if len(segment) + 2 > 0xFFFF:
+            return None
+
+        return data[:start] + b'\xff\xe1' + struct.pack('>H', len(segment) + 2) + segment + data[end:]
+
+    def _process_jpeg_to_bytes(self, input_path):
+        info = IPTCInfo(input_path)
+        description = (info['caption/abstract'] or b'').decode('utf-8', errors='replace')
+
+        if not description:
+            return False, "No description found", None
+
+        converted_description = self.convert_description(description)
+        info['caption/abstract'] = converted_description.encode('utf-8')
+
+        # Same assembly as IPTCInfo.save_as, minus its temp file
+        with open(input_path, 'rb') as fh:
+            start, end, adobe = jpeg_collect_file_parts(fh)
+        data = start + info.photoshopIIMBlock(adobe, info.packedIIMData()) + end
+
+        data = self._splice_xmp(data, converted_description)
+        if data is None:
+            return None
+        return True, "Success", data
+
+    def process_image_to_bytes(self, input_path):
+        """
+        Process an image and return its bytes instead of leaving it in an output folder.
+        JPEGs are rewritten in memory; anything else (or XMP too large for one APP1
+        segment) goes through a short-lived temp file, as libxmp needs a real file.
+        """
+        if input_path.lower().endswith(('.jpg', '.jpeg')):
+            try:
+                result = self._process_jpeg_to_bytes(input_path)
+                if result is not None:
+                    return result
+            except Exception as e:
+                self.logger.error(f"Error processing {os.path.basename(input_path)}: {str(e)}")
+                return False, str(e), None
+
+        fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(input_path)[1])
+        os.close(fd)
+        try:
+            success, message = self.process_image(input_path, temp_path)
+            if not success:
+                return False, message, None
+            with open(temp_path, 'rb') as f:
+                return True, message, f.read()
+        finally:
+            os.remove(temp_path)